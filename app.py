@@ -1,15 +1,35 @@
 import os
+import gc
 import logging
-import requests
-from io import BytesIO
-from flask import Flask, request, send_file, render_template, flash, redirect, url_for
+import struct
+import tempfile
+import threading
+import unicodedata
+import httpx
+import av
+import numpy as np
+import soundfile as sf
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from io import BytesIO, RawIOBase
+from itertools import chain
+from math import gcd
+from scipy.signal import resample_poly
+from streaming_form_data import StreamingFormDataParser
+from streaming_form_data.targets import FileTarget, ValueTarget
+from kernels import mix_into
+from encoders import Mp3Encoder
+from flask import Flask, Response, request, send_file, render_template, flash, redirect, url_for, stream_with_context
 from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
-from urllib.parse import urlparse
-from pydub import AudioSegment
+from urllib.parse import quote, urlparse
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
+# Numba logs its bytecode and IR at DEBUG for every kernel it compiles
+logging.getLogger('numba').setLevel(logging.WARNING)
 
 
 # create the app
@@ -22,6 +42,52 @@ app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1) # needed for url_for
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size
 
 
+# Shared HTTP/2 client so connections (and their TLS sessions) are reused
+# and concurrent downloads from one host are multiplexed over one connection
+http_client = httpx.Client(
+    http2=True,
+    timeout=30,
+    follow_redirects=True,
+    limits=httpx.Limits(max_keepalive_connections=32)
+)
+
+# Upper bound on the decoded PCM held by the background music cache
+MUSIC_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Size of the reads used to stream request bodies into the multipart parser
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Size of the chunks read from URL downloads
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Extension and MIME type of each mixed output format
+OUTPUT_FORMATS = {
+    'mp3': ('mp3', 'audio/mpeg'),
+    'opus': ('opus', 'audio/ogg'),
+}
+
+# Length of the slices the mix is computed, encoded and sent in
+MIX_SLICE_MS = 1000
+
+# Level of the music under the speech, with its Q15 gain worked out up
+# front, and length of its fade-out
+MUSIC_GAIN_DB = -10.0
+MUSIC_GAIN_Q15 = round(32768 * 10 ** (MUSIC_GAIN_DB / 20))
+MUSIC_FADE_MS = 2000
+
+# libopus only runs at 48 kHz and is fed fixed 20 ms frames
+OPUS_SAMPLE_RATE = 48000
+OPUS_FRAME_SIZE = 960
+
+# Extension and MIME type of the stream-copied output, by muxer name
+REMUX_FORMATS = {
+    'mp3': ('mp3', 'audio/mpeg'),
+    'ogg': ('ogg', 'audio/ogg'),
+    'flac': ('flac', 'audio/flac'),
+    'wav': ('wav', 'audio/wav'),
+    'ipod': ('m4a', 'audio/mp4'),
+}
+
 # Allowed audio file extensions
 ALLOWED_EXTENSIONS = {'mp3', 'wav', 'ogg', 'flac', 'm4a', 'aac', 'wma'}
 
@@ -30,11 +96,368 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def download_audio_from_url(url):
-    """Download audio file from URL and return as BytesIO."""
+def attachment_params(filename):
+    """
+    Content-Disposition parameters for an attachment, as send_file builds them.
+    
+    Non-ASCII names get an ASCII fallback plus an RFC 2231 filename*, since
+    raw UTF-8 is not allowed in a header value.
+    """
     try:
-        logging.debug(f"Downloading audio from URL: {url}")
-        response = requests.get(url, timeout=30, stream=True)
+        filename.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        quoted = quote(filename, safe="!#$&+^`|~")
+        return {'filename': simple, 'filename*': f"UTF-8''{quoted}"}
+    return {'filename': filename}
+
+@dataclass
+class Audio:
+    """
+    Decoded PCM audio: samples shaped (frames, channels).
+    
+    Samples are int16 PCM; 16-bit WAV files are mapped straight from disk.
+    """
+    samples: np.ndarray
+    sr: int
+
+def _sniff(head):
+    """
+    Identify an audio container from its first 16 bytes.
+    
+    Returns:
+        str: 'wav', 'flac', 'ogg', 'mp3', 'mp4' or 'other'
+    """
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return 'wav'
+    if head[:4] == b'fLaC':
+        return 'flac'
+    if head[:4] == b'OggS':
+        return 'ogg'
+    if head[4:8] == b'ftyp':
+        return 'mp4'
+    # ID3v2 tag, or a bare MPEG audio frame sync with a valid layer
+    # (ADTS AAC shares the sync word but always has layer bits 00)
+    if head[:3] == b'ID3' or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0 and head[1] & 0x06):
+        return 'mp3'
+    return 'other'
+
+def _map_wav(path):
+    """
+    Memory-map the payload of a 16-bit PCM WAV file instead of decoding it.
+    
+    Args:
+        path: Path to a RIFF/WAVE file
+    
+    Returns:
+        Audio: int16 samples backed by the file, or None if the file is not
+        plain 16-bit PCM
+    """
+    with open(path, 'rb') as f:
+        f.seek(12)
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, size = struct.unpack('<4sI', header)
+            if chunk_id == b'data':
+                data_offset = f.tell()
+                break
+            if chunk_id == b'fmt ':
+                fmt = f.read(size)
+                f.seek(size & 1, 1)
+            else:
+                f.seek(size + (size & 1), 1)
+        data_size = min(size, os.fstat(f.fileno()).st_size - data_offset)
+    
+    if fmt is None or len(fmt) < 16:
+        return None
+    format_tag, channels, sr, _, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+    # WAVE_FORMAT_EXTENSIBLE carries the real format in its sub-format GUID
+    if format_tag == 0xFFFE and len(fmt) >= 26:
+        format_tag = struct.unpack('<H', fmt[24:26])[0]
+    if format_tag != 1 or bits != 16 or block_align != 2 * channels:
+        return None
+    
+    frames = data_size // block_align
+    if not frames:
+        return None
+    # Copy-on-write so the array is writable (as the kernels expect) while
+    # pages are only read from the file when the mix touches them
+    samples = np.memmap(path, dtype='<i2', mode='c', offset=data_offset, shape=(frames, channels))
+    return Audio(np.asarray(samples), sr)
+
+def _wav_decode(fileobj):
+    """Map 16-bit PCM WAV files on disk, decoding anything else with libsndfile."""
+    if isinstance(fileobj, (str, os.PathLike)):
+        audio = _map_wav(fileobj)
+        if audio is not None:
+            return audio
+    return _sf_decode(fileobj)
+
+def _sf_decode(fileobj):
+    """Decode with libsndfile (WAV, FLAC, Ogg Vorbis/Opus and MP3)."""
+    with sf.SoundFile(fileobj) as f:
+        # libsndfile doesn't scale float samples when reading them as ints
+        if f.subtype in ('FLOAT', 'DOUBLE'):
+            samples = _to_int16(f.read(dtype='float32', always_2d=True) * 32768)
+        else:
+            samples = f.read(dtype='int16', always_2d=True)
+        return Audio(samples, f.samplerate)
+
+def _av_decode(fileobj):
+    """Decode the first audio stream of any container FFmpeg understands."""
+    with av.open(fileobj) as container:
+        stream = container.streams.audio[0]
+        # Resample to packed int16 so every frame is (1, frames * channels)
+        resampler = av.AudioResampler(format='s16', layout=stream.layout, rate=stream.rate)
+        chunks = []
+        for frame in container.decode(stream):
+            for out in resampler.resample(frame):
+                chunks.append(out.to_ndarray().reshape(-1, stream.channels))
+        for out in resampler.resample(None):
+            chunks.append(out.to_ndarray().reshape(-1, stream.channels))
+    
+    if not chunks:
+        raise ValueError("No audio frames could be decoded")
+    return Audio(np.concatenate(chunks), stream.rate)
+
+# Decoder for each sniffed container; PyAV is only needed for the rest
+DECODERS = {
+    'wav': _wav_decode,
+    'flac': _sf_decode,
+    'ogg': _sf_decode,
+    'mp3': _sf_decode,
+    'mp4': _av_decode,
+    'other': _av_decode,
+}
+
+def _load_audio(fileobj):
+    """
+    Decode an audio file in-process.
+    
+    The container is identified from its first bytes and dispatched through
+    DECODERS: libsndfile for WAV/FLAC/Ogg/MP3, PyAV for everything else (or
+    when libsndfile rejects the file). Neither probes with or spawns an
+    ffmpeg subprocess.
+    
+    Args:
+        fileobj: A file path or binary file object. Non-seekable objects
+            are demuxed sequentially by PyAV.
+    
+    Returns:
+        Audio: The decoded samples and sample rate
+    """
+    if isinstance(fileobj, (str, os.PathLike)):
+        with open(fileobj, 'rb') as f:
+            head = f.read(16)
+    elif fileobj.seekable():
+        fileobj.seek(0)
+        head = fileobj.read(16)
+        fileobj.seek(0)
+    else:
+        return _av_decode(fileobj)
+    
+    decoder = DECODERS[_sniff(head)]
+    if decoder in (_sf_decode, _wav_decode):
+        try:
+            return decoder(fileobj)
+        except sf.LibsndfileError as e:
+            logging.debug(f"libsndfile could not decode input ({e}), falling back to PyAV...")
+            if not isinstance(fileobj, (str, os.PathLike)):
+                fileobj.seek(0)
+            return _av_decode(fileobj)
+    return decoder(fileobj)
+
+class AudioCache:
+    """
+    Thread-safe LRU cache of decoded Audio, bounded by total sample bytes.
+    
+    Each entry is stored with a validator (e.g. the ETag and Last-Modified
+    headers of its URL) and only returned while the validator matches.
+    """
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key, validator):
+        """Return the cached Audio for key, or None if missing or stale."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != validator:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+    
+    def put(self, key, validator, audio):
+        """Cache audio under key, evicting least recently used entries to fit."""
+        nbytes = audio.samples.nbytes
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1].samples.nbytes
+            self._entries[key] = (validator, audio)
+            self._size += nbytes
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted.samples.nbytes
+
+music_cache = AudioCache(MUSIC_CACHE_MAX_BYTES)
+
+def _to_int16(samples):
+    """Round and saturate samples on the int16 scale back to int16 PCM."""
+    return np.clip(np.rint(samples), -32768, 32767).astype(np.int16)
+
+def _stereo_downmix_matrix(channels):
+    """
+    Weights folding channels into stereo, each output summing to unity gain.
+    
+    5.1 (FL FR FC LFE BL BR) uses the ITU-R BS.775 coefficients; any other
+    layout alternates its channels between left and right.
+    """
+    if channels == 6:
+        matrix = np.array([[1, 0], [0, 1], [0.7071, 0.7071], [0, 0], [0.7071, 0], [0, 0.7071]],
+                          dtype=np.float32)
+    else:
+        matrix = np.zeros((channels, 2), dtype=np.float32)
+        matrix[0::2, 0] = 1
+        matrix[1::2, 1] = 1
+    return matrix / matrix.sum(axis=0)
+
+def _match_channels(samples, channels):
+    """Down-mix samples the mix kernel cannot broadcast to the given (1 or 2) channels."""
+    if samples.shape[1] in (1, channels):
+        return samples
+    return _to_int16(samples.astype(np.float32) @ _stereo_downmix_matrix(samples.shape[1]))
+
+class Mix:
+    """
+    Background music prepared to be mixed under speech slice by slice.
+    
+    The music is resampled to the speech sample rate up front; each slice
+    is then looped, trimmed, attenuated by MUSIC_GAIN_DB, faded out
+    linearly over the last MUSIC_FADE_MS milliseconds and overlaid with the
+    speech by a single Numba kernel, all in int16 fixed point.
+    
+    Args:
+        speech: The decoded speech Audio
+        music: The decoded background music Audio
+    """
+    
+    def __init__(self, speech, music):
+        self.sr = speech.sr
+        # The output is at most stereo; multichannel inputs are down-mixed
+        self.channels = min(max(speech.samples.shape[1], music.samples.shape[1]), 2)
+        self._speech = _match_channels(speech.samples, self.channels)
+        
+        music_samples = music.samples
+        if music.sr != self.sr:
+            logging.debug(f"Resampling music from {music.sr}Hz to {self.sr}Hz...")
+            g = gcd(self.sr, music.sr)
+            music_samples = _to_int16(resample_poly(music_samples.astype(np.float32), self.sr // g, music.sr // g, axis=0))
+        self._music = _match_channels(music_samples, self.channels)
+        if not len(self._music):
+            raise ValueError("Music file contains no audio")
+        
+        self._n = n = len(self._speech)
+        self._fade_start = n - min(self.sr * MUSIC_FADE_MS // 1000, n)
+    
+    def __len__(self):
+        return self._n
+    
+    def slices(self, slice_ms=MIX_SLICE_MS):
+        """
+        Mix the audio a slice at a time.
+        
+        The speech and music are released once the last slice is out, so
+        the encoder finishes without them and a Mix can be consumed once.
+        
+        Yields:
+            np.ndarray: Consecutive int16 slices of the mix, shaped (frames, channels)
+        """
+        step = max(self.sr * slice_ms // 1000, 1)
+        for start in range(0, self._n, step):
+            out = np.empty((min(step, self._n - start), self.channels), dtype=np.int16)
+            mix_into(self._speech, self._music, MUSIC_GAIN_Q15, self._fade_start, out, start)
+            yield out
+        self._speech = self._music = None
+
+def parse_multipart_upload(directory):
+    """
+    Stream the multipart/form-data request body straight to disk.
+    
+    File parts are written into directory as they arrive instead of going
+    through werkzeug's form parser.
+    
+    Args:
+        directory: Directory to write the uploaded files into
+    
+    Returns:
+        tuple: (form, files) where form maps the URL fields to their values
+        and files maps each uploaded file field to its FileTarget. The
+        target's filename is the path on disk and multipart_filename the
+        name sent by the client.
+    """
+    parser = StreamingFormDataParser(headers=request.headers)
+    values = {name: ValueTarget() for name in ('speech_url', 'music_url')}
+    files = {name: FileTarget(os.path.join(directory, name)) for name in ('speech', 'music')}
+    for name, target in {**values, **files}.items():
+        parser.register(name, target)
+    
+    while chunk := request.stream.read(UPLOAD_CHUNK_SIZE):
+        parser.data_received(chunk)
+    
+    form = {name: target.value.decode('utf-8', 'replace') for name, target in values.items()}
+    files = {name: target for name, target in files.items() if target.multipart_filename is not None}
+    return form, files
+
+class ResponseStream(RawIOBase):
+    """
+    Read-only, non-seekable file object over a streamed httpx response.
+    
+    Lets a decoder consume a download as it arrives instead of after the
+    whole body has been buffered.
+    """
+    
+    def __init__(self, response):
+        self.response = response
+        self._chunks = response.iter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE)
+        self._chunk = memoryview(b'')
+    
+    def readable(self):
+        return True
+    
+    def peek(self, size):
+        """Return up to size bytes from the current chunk without consuming them."""
+        if not self._chunk:
+            self._chunk = memoryview(next(self._chunks, b''))
+        return bytes(self._chunk[:size])
+    
+    def readinto(self, b):
+        if not self._chunk:
+            self._chunk = memoryview(next(self._chunks, b''))
+        n = min(len(b), len(self._chunk))
+        b[:n] = self._chunk[:n]
+        self._chunk = self._chunk[n:]
+        return n
+    
+    def iter_chunks(self):
+        """Yield the rest of the body, starting with any partly read chunk."""
+        if self._chunk:
+            yield self._chunk
+            self._chunk = memoryview(b'')
+        yield from self._chunks
+
+@contextmanager
+def _open_audio_url(url):
+    """Open a streamed GET request for url, checking that it looks like audio."""
+    with http_client.stream('GET', url) as response:
         response.raise_for_status()
         
         # Check content type
@@ -45,76 +468,266 @@ def download_audio_from_url(url):
             if not any(ext in parsed_url.path.lower() for ext in ['.mp3', '.wav', '.ogg', '.flac', '.m4a', '.aac']):
                 raise ValueError(f"URL does not appear to be an audio file: {url}")
         
-        # Download content to BytesIO
-        audio_buffer = BytesIO()
-        for chunk in response.iter_content(chunk_size=8192):
-            audio_buffer.write(chunk)
+        yield response
+
+def _buffer_response(stream):
+    """Read the rest of a ResponseStream into a BytesIO."""
+    headers = stream.response.headers
+    audio_buffer = BytesIO()
+    content_length = int(headers.get('content-length', 0))
+    if 0 < content_length <= app.config['MAX_CONTENT_LENGTH'] and 'content-encoding' not in headers:
+        # Grow the buffer to its final size up front so the writes
+        # below fill it in place instead of repeatedly reallocating
+        audio_buffer.seek(content_length - 1)
+        audio_buffer.write(b'\0')
         audio_buffer.seek(0)
+    for chunk in stream.iter_chunks():
+        audio_buffer.write(chunk)
+    audio_buffer.truncate()
+    audio_buffer.seek(0)
+    return audio_buffer
+
+def download_audio_from_url(url):
+    """Download audio file from URL and return as BytesIO."""
+    try:
+        logging.debug(f"Downloading audio from URL: {url}")
+        with _open_audio_url(url) as response:
+            return _buffer_response(ResponseStream(response))
         
-        return audio_buffer
+    except httpx.HTTPError as e:
+        raise ValueError(f"Failed to download audio from URL {url}: {str(e)}")
+    except Exception as e:
+        raise ValueError(f"Error processing URL {url}: {str(e)}")
+
+def load_audio_from_url(url):
+    """
+    Download and decode audio from a URL without buffering the whole file.
+    
+    The response body is fed to the decoder as it arrives. MP4/M4A files are
+    the exception: their index may sit at the end of the file, which needs
+    a seekable input, so they are downloaded into memory first.
+    
+    Args:
+        url: The audio URL
+    
+    Returns:
+        Audio: The decoded samples and sample rate
+    """
+    try:
+        logging.debug(f"Streaming audio from URL: {url}")
+        with _open_audio_url(url) as response:
+            stream = ResponseStream(response)
+            if _sniff(stream.peek(16)) == 'mp4':
+                logging.debug("MP4 container, buffering download before decoding...")
+                return _load_audio(_buffer_response(stream))
+            return _load_audio(stream)
         
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise ValueError(f"Failed to download audio from URL {url}: {str(e)}")
     except Exception as e:
         raise ValueError(f"Error processing URL {url}: {str(e)}")
 
-def process_audio_files(speech_file, music_file):
+def _url_validator(url):
+    """Return the (ETag, Last-Modified) of url, or None if it has neither."""
+    try:
+        response = http_client.head(url)
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    validator = (response.headers.get('etag'), response.headers.get('last-modified'))
+    return validator if any(validator) else None
+
+def load_music_from_url(url):
     """
-    Process and mix the speech and music audio files.
+    Load background music from a URL, reusing the decoded PCM when possible.
+    
+    Callers often send the same music URL over and over, so the decoded
+    audio is kept in music_cache. A HEAD request checks that the resource
+    is unchanged (same ETag/Last-Modified) before a cached copy is used;
+    URLs that send neither header are never cached.
     
     Args:
-        speech_file: The speech audio file
-        music_file: The background music file
+        url: The music URL
     
     Returns:
-        BytesIO: The mixed audio as MP3 bytes
+        Audio: The decoded samples and sample rate
+    """
+    validator = _url_validator(url)
+    if validator is not None:
+        audio = music_cache.get(url, validator)
+        if audio is not None:
+            logging.debug(f"Using cached music for URL: {url}")
+            return audio
+    
+    audio = load_audio_from_url(url)
+    if validator is not None:
+        music_cache.put(url, validator, audio)
+    return audio
+
+class ChunkSink(RawIOBase):
+    """Write-only stream that hands back whatever has been written since the last take()."""
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+    
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def encode_mp3(mixed):
+    """
+    Encode a Mix to MP3 in-process with LAME, a slice at a time.
+    
+    Args:
+        mixed: The Mix to encode
+    
+    Yields:
+        bytes: MP3 frames, as they are produced
+    """
+    encoder = Mp3Encoder(mixed.sr, mixed.channels)
+    for pcm in mixed.slices():
+        yield encoder.encode(pcm.tobytes())
+    yield encoder.flush()
+
+def encode_opus(mixed, bit_rate=96000):
+    """
+    Encode a Mix to Ogg Opus in-process with PyAV, a slice at a time.
+    
+    Args:
+        mixed: The Mix to encode
+        bit_rate: Target bit rate in bits per second
+    
+    Yields:
+        bytes: Ogg pages, as the muxer writes them out
+    """
+    layout = f'{mixed.channels}c'
+    sink = ChunkSink()
+    with av.open(sink, 'w', format='ogg') as container:
+        stream = container.add_stream('libopus', rate=OPUS_SAMPLE_RATE)
+        stream.layout = layout
+        stream.bit_rate = bit_rate
+        
+        resampler = av.AudioResampler(format='s16', layout=layout, rate=OPUS_SAMPLE_RATE,
+                                      frame_size=OPUS_FRAME_SIZE)
+        for pcm in mixed.slices():
+            frame = av.AudioFrame.from_ndarray(pcm.reshape(1, -1), format='s16', layout=layout)
+            frame.sample_rate = mixed.sr
+            for resampled in resampler.resample(frame):
+                container.mux(stream.encode(resampled))
+            yield sink.take()
+        for resampled in resampler.resample(None):
+            container.mux(stream.encode(resampled))
+        container.mux(stream.encode(None))
+    yield sink.take()
+
+def process_audio_files(speech_file, music_file, output_format='mp3'):
+    """
+    Process and mix the speech and music audio files.
+    
+    Nothing is decoded until the first chunk is requested; after that the
+    mix is computed and encoded one slice ahead of what has been consumed.
+    
+    Args:
+        speech_file: The speech audio file, or its already decoded Audio
+        music_file: The background music file, or its already decoded Audio
+        output_format: A key of OUTPUT_FORMATS
+    
+    Yields:
+        bytes: The mixed audio encoded in output_format
     """
     try:
         # Load audio files
         logging.debug("Loading speech audio...")
-        speech = AudioSegment.from_file(speech_file)
+        speech = speech_file if isinstance(speech_file, Audio) else _load_audio(speech_file)
         
         logging.debug("Loading music audio...")
-        music = AudioSegment.from_file(music_file)
+        music = music_file if isinstance(music_file, Audio) else _load_audio(music_file)
         
-        # Get speech duration
-        speech_duration = len(speech)
-        logging.debug(f"Speech duration: {speech_duration}ms")
+        logging.debug(f"Speech duration: {len(speech.samples) * 1000 // speech.sr}ms")
         
-        # Match music duration to speech duration
-        if len(music) < speech_duration:
-            # Music is shorter than speech, loop it
-            logging.debug("Music is shorter than speech, looping...")
-            loops_needed = (speech_duration // len(music)) + 1
-            music = music * loops_needed
-        
-        # Trim music to match speech duration exactly
-        music = music[:speech_duration]
-        logging.debug(f"Adjusted music duration: {len(music)}ms")
-        
-        # Reduce music volume by 10 dB
-        logging.debug("Reducing music volume by 10 dB...")
-        music = music - 10
+        # Loop, trim, attenuate, fade and overlay slice by slice as the
+        # encoder asks for them
+        logging.debug("Mixing speech and music...")
+        mixed = Mix(speech, music)
+        # The Mix holds everything it needs; drop these references so that
+        # decoded audio it doesn't use (e.g. music at its original sample
+        # rate) is freed before encoding. The caller hands over its own
+        # references, but music from music_cache stays alive in the cache
+        del speech, music, speech_file, music_file
         
-        # Apply fade-out effect to music
-        fade_duration = min(2000, speech_duration)  # 2 seconds or less if speech is shorter
-        logging.debug(f"Applying {fade_duration}ms fade-out to music...")
-        music = music.fade_out(fade_duration)
+        if output_format == 'opus':
+            logging.debug("Encoding mixed audio to Opus...")
+            yield from encode_opus(mixed)
+        else:
+            logging.debug("Encoding mixed audio to MP3...")
+            yield from encode_mp3(mixed)
         
-        # Overlay speech on top of music
-        logging.debug("Mixing speech and music...")
-        mixed_audio = music.overlay(speech)
+    except Exception as e:
+        logging.error(f"Error processing audio files: {str(e)}")
+        raise
+    
+    finally:
+        # Collect once per request, after encoding, so that reference cycles
+        # (e.g. in PyAV containers) don't keep PCM buffers alive
+        gc.collect()
+
+def remux_music(speech_file, music_file):
+    """
+    Copy the music stream, cut to the speech duration, without re-encoding.
+    
+    Packets are moved from the music container into a new container of the
+    same kind, so no decoder or encoder runs. No gain, fade or overlay is
+    applied and music shorter than the speech is not looped.
+    
+    Args:
+        speech_file: The speech audio file (only its duration is used)
+        music_file: The background music file
+    
+    Returns:
+        tuple: (BytesIO, extension, mimetype) of the remuxed music
+    """
+    try:
+        with av.open(speech_file) as container:
+            duration = container.duration / av.time_base if container.duration else None
+        if duration is None:
+            speech = _load_audio(speech_file)
+            duration = len(speech.samples) / speech.sr
+        logging.debug(f"Remuxing music up to {duration:.3f}s...")
         
-        # Export to MP3 in memory
-        logging.debug("Exporting mixed audio to MP3...")
         output_buffer = BytesIO()
-        mixed_audio.export(output_buffer, format="mp3", bitrate="192k")
-        output_buffer.seek(0)
+        with av.open(music_file) as src:
+            in_stream = src.streams.audio[0]
+            out_format = src.format.name.split(',')[0]
+            if out_format == 'mov':
+                out_format = 'ipod'
+            if out_format not in REMUX_FORMATS:
+                raise ValueError(f"Cannot remux music container '{src.format.name}'")
+            
+            with av.open(output_buffer, 'w', format=out_format) as dst:
+                out_stream = dst.add_stream_from_template(in_stream)
+                for packet in src.demux(in_stream):
+                    # Skip the flush packet demux() yields at end of stream
+                    if packet.dts is None:
+                        continue
+                    if packet.pts is not None and packet.pts * in_stream.time_base >= duration:
+                        break
+                    packet.stream = out_stream
+                    dst.mux(packet)
         
-        return output_buffer
+        output_buffer.seek(0)
+        extension, mimetype = REMUX_FORMATS[out_format]
+        return output_buffer, extension, mimetype
         
     except Exception as e:
-        logging.error(f"Error processing audio files: {str(e)}")
+        logging.error(f"Error remuxing audio files: {str(e)}")
         raise
 
 @app.route('/')
@@ -136,24 +749,66 @@ def mix_audio():
     - speech_url and music_url: URLs to audio files
     - speech and music: Uploaded audio files (multipart/form-data)
     
+    Query parameters:
+    - format=mp3|opus: Encoding of the mixed audio (default mp3)
+    - mode=remux: Return the music cut to the speech duration, stream-copied
+      without mixing or re-encoding; cannot be combined with format
+    
     Returns:
-    - Mixed audio as downloadable MP3 file
+    - Mixed audio as downloadable MP3 (or Opus) file
     """
+    upload_dir = None
+    # Form submissions get flashed errors and a redirect, API calls get JSON
+    from_form = request.mimetype == 'multipart/form-data'
     try:
         speech_file = None
         music_file = None
         speech_name = "speech"
         music_name = "music"
         
+        # Multipart bodies are streamed to a temporary directory; anything
+        # else (e.g. URL-encoded forms) goes through request.form as usual
+        if from_form:
+            upload_dir = tempfile.TemporaryDirectory()
+            form, files = parse_multipart_upload(upload_dir.name)
+        else:
+            form, files = request.form, {}
+        
+        output_format = request.args.get('format', 'mp3')
+        if output_format not in OUTPUT_FORMATS:
+            error_msg = f'Invalid output format. Allowed formats: {", ".join(OUTPUT_FORMATS)}'
+            if from_form:
+                flash(error_msg, 'error')
+                return redirect(url_for('index'))
+            return {'error': error_msg}, 400
+        
+        # Remuxing keeps the music's own container, so a format can't apply
+        remux = request.args.get('mode') == 'remux'
+        if remux and 'format' in request.args:
+            error_msg = 'The format parameter cannot be combined with mode=remux.'
+            if from_form:
+                flash(error_msg, 'error')
+                return redirect(url_for('index'))
+            return {'error': error_msg}, 400
+        
         # Check if URLs are provided
-        speech_url = request.form.get('speech_url', '').strip()
-        music_url = request.form.get('music_url', '').strip()
+        speech_url = form.get('speech_url', '').strip()
+        music_url = form.get('music_url', '').strip()
         
         if speech_url and music_url:
             # URL input mode
             logging.debug("Using URL input mode")
-            speech_file = download_audio_from_url(speech_url)
-            music_file = download_audio_from_url(music_url)
+            # Fetch both files concurrently so their round trips overlap.
+            # Remuxing needs the files themselves; mixing decodes while
+            # downloading and can reuse previously decoded music.
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                if remux:
+                    speech_future = executor.submit(download_audio_from_url, speech_url)
+                    music_future = executor.submit(download_audio_from_url, music_url)
+                else:
+                    speech_future = executor.submit(load_audio_from_url, speech_url)
+                    music_future = executor.submit(load_music_from_url, music_url)
+                speech_file, music_file = speech_future.result(), music_future.result()
             speech_name = urlparse(speech_url).path.split('/')[-1].split('.')[0] or "speech"
             music_name = urlparse(music_url).path.split('/')[-1].split('.')[0] or "music"
             
@@ -162,59 +817,83 @@ def mix_audio():
             logging.debug("Using file upload mode")
             
             # Check if files are present in request
-            if 'speech' not in request.files or 'music' not in request.files:
-                if request.content_type and 'multipart/form-data' in request.content_type:
+            if 'speech' not in files or 'music' not in files:
+                if from_form:
                     flash('Both speech and music files are required.', 'error')
                     return redirect(url_for('index'))
                 return {'error': 'Both speech and music files are required.'}, 400
             
-            speech_file = request.files['speech']
-            music_file = request.files['music']
+            speech_upload = files['speech']
+            music_upload = files['music']
+            speech_filename = speech_upload.multipart_filename
+            music_filename = music_upload.multipart_filename
             
             # Check if files were actually selected
-            if speech_file.filename == '' or music_file.filename == '':
-                if request.content_type and 'multipart/form-data' in request.content_type:
+            if speech_filename == '' or music_filename == '':
+                if from_form:
                     flash('Please select both speech and music files.', 'error')
                     return redirect(url_for('index'))
                 return {'error': 'Please select both speech and music files.'}, 400
             
             # Validate file types
-            if not (allowed_file(speech_file.filename) and allowed_file(music_file.filename)):
+            if not (allowed_file(speech_filename) and allowed_file(music_filename)):
                 error_msg = f'Invalid file type. Allowed types: {", ".join(ALLOWED_EXTENSIONS)}'
-                if request.content_type and 'multipart/form-data' in request.content_type:
+                if from_form:
                     flash(error_msg, 'error')
                     return redirect(url_for('index'))
                 return {'error': error_msg}, 400
             
-            speech_name = secure_filename(speech_file.filename or "speech").rsplit('.', 1)[0]
-            music_name = secure_filename(music_file.filename or "music").rsplit('.', 1)[0]
+            speech_name = secure_filename(speech_filename or "speech").rsplit('.', 1)[0]
+            music_name = secure_filename(music_filename or "music").rsplit('.', 1)[0]
+            
+            # Decode straight from the files written by the parser
+            speech_file = speech_upload.filename
+            music_file = music_upload.filename
         
         logging.debug(f"Processing audio: speech={speech_name}, music={music_name}")
         
-        # Process audio files
-        mixed_audio_buffer = process_audio_files(speech_file, music_file)
+        if remux:
+            mixed_audio_buffer, extension, mimetype = remux_music(speech_file, music_file)
+            output_filename = f"mixed_{speech_name}_{music_name}.{extension}"
+            logging.debug(f"Sending mixed audio file: {output_filename}")
+            return send_file(
+                mixed_audio_buffer,
+                as_attachment=True,
+                download_name=output_filename,
+                mimetype=mimetype
+            )
         
-        # Generate output filename
-        output_filename = f"mixed_{speech_name}_{music_name}.mp3"
+        # Pull the first chunk here so that decoding errors still get an
+        # error response; the rest is encoded while the client downloads
+        chunks = process_audio_files(speech_file, music_file, output_format)
+        # Leave the generator holding the only references to decoded audio
+        speech_file = music_file = None
+        first_chunk = next(chunks)
+        extension, mimetype = OUTPUT_FORMATS[output_format]
+        output_filename = f"mixed_{speech_name}_{music_name}.{extension}"
         
-        logging.debug(f"Sending mixed audio file: {output_filename}")
+        logging.debug(f"Streaming mixed audio file: {output_filename}")
         
-        # Return the mixed audio file
-        return send_file(
-            mixed_audio_buffer,
-            as_attachment=True,
-            download_name=output_filename,
-            mimetype='audio/mpeg'
-        )
+        response = Response(stream_with_context(chain([first_chunk], chunks)), mimetype=mimetype)
+        response.headers.set('Content-Disposition', 'attachment', **attachment_params(output_filename))
+        if upload_dir is not None:
+            # The uploads are still being read from until the stream ends
+            response.call_on_close(upload_dir.cleanup)
+            upload_dir = None
+        return response
         
     except Exception as e:
         error_msg = f'Error processing audio files: {str(e)}'
         logging.error(error_msg)
         
-        if request.content_type and 'multipart/form-data' in request.content_type:
+        if from_form:
             flash(error_msg, 'error')
             return redirect(url_for('index'))
         return {'error': error_msg}, 500
+    
+    finally:
+        if upload_dir is not None:
+            upload_dir.cleanup()
 
 @app.errorhandler(413)
 def too_large(e):
@@ -0,0 +1,27 @@
+import lameenc
+
+
+class Mp3Encoder:
+    """
+    In-process MP3 encoder (LAME through the lameenc binding).
+
+    PCM is handed to libmp3lame directly from Python memory, without an
+    ffmpeg process in between or a copy of the buffer through a pipe.
+    """
+
+    def __init__(self, sr, channels, bitrate=192):
+        if channels not in (1, 2):
+            raise ValueError(f"MP3 supports mono or stereo audio, got {channels} channels")
+        self._encoder = lameenc.Encoder()
+        self._encoder.set_bit_rate(bitrate)
+        self._encoder.set_in_sample_rate(sr)
+        self._encoder.set_channels(channels)
+
+    def encode(self, pcm):
+        """Encode interleaved s16le PCM, returning whatever MP3 frames are ready."""
+        return bytes(self._encoder.encode(pcm))
+
+    def flush(self):
+        """Encode any buffered samples and return the final MP3 frames."""
+        return bytes(self._encoder.flush())
+
@@ -0,0 +1,21 @@
+import multiprocessing
+import os
+
+# Bind to the port provided by the platform, defaulting to the dev port
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Threaded workers: libsndfile, PyAV and LAME release the GIL, so decoding
+# and encoding overlap across requests in one worker. Mix kernel calls are
+# serialised per worker by kernels._kernel_lock, but each call is spread
+# over the worker's Numba thread pool
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Split the CPUs between the workers' Numba pools instead of giving every
+# worker a pool of cpu_count() threads. Workers import the app after
+# forking, so they pick this up before Numba starts
+os.environ.setdefault('NUMBA_NUM_THREADS', str(max(1, multiprocessing.cpu_count() // workers)))
+
+# Mixing long recordings can take well over the 30 second default
+timeout = 300
@@ -0,0 +1,129 @@
+import threading
+
+import numpy as np
+import numba
+from numba import njit, prange
+
+# Numba's default workqueue threading layer must not be entered from more
+# than one Python thread at a time, and Flask serves requests on threads.
+_kernel_lock = threading.Lock()
+
+# Kernels specialised for one input shape, keyed by
+# (speech channels, music channels, channels, gain_q15)
+_specialised = {}
+_specialised_lock = threading.Lock()
+MAX_SPECIALISED_KERNELS = 32
+
+_KERNEL_TEMPLATE = '''
+def kernel(speech, music, fade, inv_fade, start, n, out):
+    m = music.shape[0]
+    for k in prange(out.shape[0]):
+        i = start + k
+        g = ({gain_q15} * ((min(n - i, fade) * inv_fade) >> 32)) >> 15
+        j = i % m
+{body}
+'''
+
+_CHANNEL_TEMPLATE = (
+    '        out[k, {c}] = min(32767, max(-32768, speech[i, {sc}] + ((music[j, {mc}] * g) >> 15)))'
+)
+
+
+def _fade_q47(n, fade_start):
+    """Fade length (at least 1) and its Q47 reciprocal, rounded up, for the ramp."""
+    fade = max(n - fade_start, 1)
+    return fade, -(-(1 << 47) // fade)
+
+
+@njit(parallel=True, fastmath=True, cache=True, nogil=True)
+def mix_kernel(speech, music, gain_q15, fade, inv_fade, start, n, out):
+    """
+    Overlay looped, attenuated and faded music under frames start to
+    start + len(out) of the n speech frames, in one pass.
+
+    All arithmetic is fixed point on int16 PCM. The gain is Q15 and the
+    ramp, 1.0 (32768) until the last fade samples and then falling
+    linearly towards 0 at n, is min(n - i, fade) * inv_fade in Q47 shifted
+    down to Q15; min() keeps it branchless and the product in range. The
+    sum is saturated to int16. Mono inputs are broadcast across the output
+    channels.
+    """
+    m = music.shape[0]
+    channels = out.shape[1]
+    speech_ch = speech.shape[1]
+    music_ch = music.shape[1]
+    for k in prange(out.shape[0]):
+        i = start + k
+        g = (gain_q15 * ((min(n - i, fade) * inv_fade) >> 32)) >> 15
+        j = i % m
+        for c in range(channels):
+            v = speech[i, c % speech_ch] + ((music[j, c % music_ch] * g) >> 15)
+            out[k, c] = min(32767, max(-32768, v))
+
+
+def _compile_specialised(key):
+    """
+    Generate and compile a mix kernel with the shape of key baked in.
+
+    The channel loop is unrolled and the gain becomes a literal, so LLVM
+    folds it into the loop instead of loading it per sample. The fade
+    length stays an argument, as it varies with the length of short clips.
+    """
+    speech_ch, music_ch, channels, gain_q15 = key
+    body = '\n'.join(
+        _CHANNEL_TEMPLATE.format(c=c, sc=c if speech_ch > 1 else 0, mc=c if music_ch > 1 else 0)
+        for c in range(channels)
+    )
+    source = _KERNEL_TEMPLATE.format(gain_q15=gain_q15, body=body)
+    namespace = {'prange': prange, 'min': min, 'max': max}
+    exec(compile(source, f'<mix kernel {key}>', 'exec'), namespace)
+
+    pcm = numba.int16[:, ::1]
+    signature = numba.void(pcm, pcm, numba.int64, numba.int64, numba.int64, numba.int64, pcm)
+    kernel = njit(signature, parallel=True, fastmath=True, nogil=True)(namespace['kernel'])
+    _specialised[key] = kernel
+    return kernel
+
+
+def _specialised_kernel(speech, music, gain_q15, out):
+    """
+    Return the specialised kernel for this shape, or None if it isn't ready.
+
+    Unseen shapes are compiled on a background thread (until
+    MAX_SPECIALISED_KERNELS exist), so no request waits for a compile;
+    until then the generic mix_kernel is used.
+    """
+    if not (speech.flags.c_contiguous and music.flags.c_contiguous) or out.shape[1] > 2:
+        return None
+    key = (speech.shape[1], music.shape[1], out.shape[1], gain_q15)
+    with _specialised_lock:
+        if key in _specialised:
+            return _specialised[key]
+        if len(_specialised) >= MAX_SPECIALISED_KERNELS:
+            return None
+        # Reserve the slot so the shape is compiled only once
+        _specialised[key] = None
+    threading.Thread(target=_compile_specialised, args=(key,), daemon=True).start()
+    return None
+
+
+def mix_into(speech, music, gain_q15, fade_start, out, start=0):
+    """Mix speech frames start to start + len(out) into out; all arrays are int16 PCM."""
+    n = len(speech)
+    fade, inv_fade = _fade_q47(n, fade_start)
+    kernel = _specialised_kernel(speech, music, gain_q15, out)
+    with _kernel_lock:
+        if kernel is not None:
+            kernel(speech, music, fade, inv_fade, start, n, out)
+        else:
+            mix_kernel(speech, music, gain_q15, fade, inv_fade, start, n, out)
+    return out
+
+
+def _warm_up():
+    """Compile mix_kernel so the first request doesn't pay for it."""
+    samples = np.zeros((2, 1), dtype=np.int16)
+    mix_kernel(samples, samples, 1 << 15, 1, 1 << 47, 0, 2, np.empty((2, 1), dtype=np.int16))
+
+
+_warm_up()